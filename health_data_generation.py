@@ -1,18 +1,25 @@
 # Import necessary libraries
 import pandas as pd                # For data manipulation and DataFrame operations
-import numpy as np                 # Commonly used for numerical operations (not used directly here)
+import numpy as np                 # For vectorized numerical operations and random sampling
 from faker import Faker            # To generate realistic fake data for testing
-import random                     # To make random choices and generate random numbers
 from datetime import datetime    # To work with dates and timestamps
 import pyarrow as pa             # Apache Arrow library, used for in-memory columnar data representation
 import pyarrow.parquet as pq     # For reading/writing Parquet files, an efficient columnar storage format
+import pyarrow.compute as pc     # Vectorized compute functions on Arrow data (used for partitioning)
 import io                        # Provides in-memory byte streams for file operations
-import json                      # To serialize and deserialize JSON data
+import re                        # Regular expressions for post-processing serialized JSON
+from concurrent.futures import ThreadPoolExecutor  # To run independent GCS requests concurrently
+import uuid                      # To generate unique identifiers for records
 from google.cloud import storage # Google Cloud Storage client library to interact with GCS buckets
+from google.api_core.exceptions import Conflict, Forbidden  # Errors returned when bucket creation is not possible
 import os                        # To interact with environment variables and file paths
+import logging                   # For optional debug-level progress messages
 from dotenv import load_dotenv   # Loads environment variables from a .env file for security
 
 
+# Module-level logger for detailed progress messages (hidden unless DEBUG logging is enabled)
+logger = logging.getLogger(__name__)
+
 # Load environment variables from a .env file to keep sensitive data (like API keys) out of code
 load_dotenv()
 
@@ -32,6 +39,16 @@ for bucket in buckets:
 # Initialize Faker object to generate fake data
 fake = Faker()
 
+# Initialize NumPy random generator used to sample whole columns at once
+rng = np.random.default_rng()
+
+# Pre-generate pools of names and zip codes once with Faker; generators sample
+# from these pools instead of calling Faker for every record
+FAKER_POOL_SIZE = 5000
+FIRST_NAMES = np.array([fake.first_name() for _ in range(FAKER_POOL_SIZE)])
+LAST_NAMES = np.array([fake.last_name() for _ in range(FAKER_POOL_SIZE)])
+ZIP_CODES = np.array([fake.zipcode() for _ in range(FAKER_POOL_SIZE)])
+
 # Define constants for the bucket and folder paths for dev and prod environments
 BUCKET_NAME = 'healthcare-data-bucket-treadway'
 DEV_PATH = 'dev/'
@@ -41,10 +58,35 @@ PROD_PATH = 'prod/'
 DEV_RECORDS = 5000
 PROD_RECORDS = 20000
 
+# Maximum number of blob deletes sent in a single GCS batch request
+DELETE_BATCH_SIZE = 100
+
+# Chunk size for resumable GCS uploads (must be a multiple of 256 KiB).
+# Only applies to files larger than 8 MiB; smaller files with a known size
+# are sent in a single request.
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+# Low-cardinality columns that benefit from dictionary encoding in Parquet files
+PARQUET_DICTIONARY_COLUMNS = ['diagnosis_code', 'diagnosis_desc', 'procedure_code', 'status']
+
 # Define date range for generating realistic date values
 start_date = datetime(2020, 1, 1)
 end_date = datetime.today()
 
+# Diagnosis codes used in EHR records, mapped to their descriptions.
+# Kept at module level so the mapping is built once rather than per record.
+DIAGNOSIS_DESCRIPTIONS = {
+    'E11.9': 'Type 2 diabetes mellitus',
+    'I10': 'Essential hypertension',
+    'J45': 'Asthma',
+    'N18.9': 'Chronic kidney disease',
+    'Z00.0': 'General medical exam'
+}
+DIAGNOSIS_CODES = np.array(list(DIAGNOSIS_DESCRIPTIONS))
+
+# Bucket handle shared by all GCS helpers (a local object, no API call is made here)
+gcs_bucket = storage_client.bucket(BUCKET_NAME)
+
 
 def create_bucket():
     """
@@ -52,12 +94,23 @@ def create_bucket():
     Handles exceptions gracefully.
     """
     try:
-        bucket = storage_client.bucket(BUCKET_NAME)
-        if not bucket.exists():
-            storage_client.create_bucket(BUCKET_NAME)
-            print(f"Bucket '{BUCKET_NAME}' created successfully.")
-        else:
-            print(f"Bucket '{BUCKET_NAME}' already exists.")
+        # Attempt creation directly; an existing bucket is reported as a Conflict,
+        # which saves a separate exists() round trip
+        storage_client.create_bucket(gcs_bucket)
+        print(f"Bucket '{BUCKET_NAME}' created successfully.")
+    except Conflict:
+        # GCS also returns Conflict when the name is taken by a bucket in another project
+        print(f"Bucket '{BUCKET_NAME}' already exists (or the name is taken by a bucket this account does not own).")
+    except Forbidden:
+        # The service account may be allowed to use the bucket but not create buckets,
+        # so fall back to checking whether the bucket is already there
+        try:
+            if gcs_bucket.exists():
+                print(f"Bucket '{BUCKET_NAME}' already exists.")
+            else:
+                print(f"Bucket '{BUCKET_NAME}' does not exist and cannot be created with these credentials.")
+        except Exception as e:
+            print(f"Error creating bucket: {e}")
     except Exception as e:
         print(f"Error creating bucket: {e}")
 
@@ -67,39 +120,118 @@ def empty_gcs_folder(path):
     Delete all objects/blobs within the given folder path inside the GCS bucket.
     This is useful to clear out old data before uploading fresh datasets.
     """
-    print(f"Emptying folder '{path}' in GCS bucket '{BUCKET_NAME}'...")
-    bucket = storage_client.bucket(BUCKET_NAME)
-    blobs = bucket.list_blobs(prefix=path)
-    for blob in blobs:
-        blob.delete()
-        print(f"Deleted '{blob.name}'")
-    print(f"Completed emptying folder '{path}'.")
+    blobs = list(gcs_bucket.list_blobs(prefix=path))
+
+    # Group deletes into batch requests instead of one HTTP request per blob
+    for i in range(0, len(blobs), DELETE_BATCH_SIZE):
+        with storage_client.batch():
+            for blob in blobs[i:i + DELETE_BATCH_SIZE]:
+                blob.delete()
+    # Report a single summary line rather than one line per blob
+    print(f"Deleted {len(blobs)} blobs from folder '{path}' in GCS bucket '{BUCKET_NAME}'.")
 
 
 def upload_to_gcs(data, path, filename, file_format):
     """
     Upload given data to Google Cloud Storage at the specified path and filename.
     Supports CSV, JSON (newline delimited), and Parquet formats.
+    CSV and JSON data are given as a pandas DataFrame, Parquet data as an Apache Arrow Table.
     """
-    print(f"Uploading {filename} in {file_format} format to GCS...")
-    bucket = storage_client.bucket(BUCKET_NAME)
-    blob = bucket.blob(path + filename)
+    logger.debug("Uploading %s in %s format to GCS...", filename, file_format)
+    # Files up to 8 MiB are uploaded in a single request when their size is passed;
+    # larger files use a resumable upload sent in chunks of UPLOAD_CHUNK_SIZE
+    blob = gcs_bucket.blob(path + filename, chunk_size=UPLOAD_CHUNK_SIZE)
 
     if file_format == 'csv':
-        # Convert DataFrame to CSV string and upload
-        csv_data = data.to_csv(index=False)
-        blob.upload_from_string(csv_data, content_type='text/csv')
+        # Write DataFrame as CSV straight into an in-memory bytes buffer and upload
+        buffer = io.BytesIO()
+        data.to_csv(buffer, index=False, encoding='utf-8')
+        buffer.seek(0)
+        blob.upload_from_file(buffer, size=buffer.getbuffer().nbytes, content_type='text/csv')
     elif file_format == 'json':
-        # Upload JSON data as newline-delimited string
-        json_data = "\n".join(data)
-        blob.upload_from_string(json_data, content_type='application/json')
+        # Write DataFrame as newline-delimited JSON into an in-memory bytes buffer and upload.
+        # Date columns are written as YYYY-MM-DD (as in the CSV output) so they load
+        # into BigQuery DATE columns, rather than as ISO timestamps.
+        date_columns = {
+            col: data[col].astype(str) for col in data.columns
+            if pd.api.types.infer_dtype(data[col], skipna=True) == 'date'
+        }
+        json_data = data.assign(**date_columns).to_json(orient='records', lines=True, date_format='iso')
+        # pandas escapes '/' as '\/'; undo that (keeping escaped backslashes intact)
+        # so values like blood_pressure are written as '120/72'
+        json_data = re.sub(r'(?<!\\)((?:\\\\)*)\\/', r'\1/', json_data)
+        buffer = io.BytesIO(json_data.encode('utf-8'))
+        blob.upload_from_file(buffer, size=buffer.getbuffer().nbytes, content_type='application/x-ndjson')
     elif file_format == 'parquet':
-        # Write Apache Arrow Table to in-memory bytes buffer and upload as Parquet
+        # Write Apache Arrow Table to in-memory bytes buffer and upload as Parquet.
+        # zstd keeps the upload small, and column statistics allow downstream
+        # readers to skip row groups when filtering.
         buffer = io.BytesIO()
-        pq.write_table(data, buffer)
+        pq.write_table(
+            data,
+            buffer,
+            compression='zstd',
+            compression_level=3,
+            use_dictionary=[col for col in PARQUET_DICTIONARY_COLUMNS if col in data.column_names],
+            data_page_size=1024 * 1024,
+            write_statistics=True
+        )
         buffer.seek(0)
-        blob.upload_from_file(buffer, content_type='application/octet-stream')
-    print(f"Uploaded {filename} to {path}")
+        blob.upload_from_file(
+            buffer, size=buffer.getbuffer().nbytes, content_type='application/octet-stream'
+        )
+    logger.debug("Uploaded %s to %s", filename, path)
+
+
+def partition_table(table, column):
+    """
+    Split an Apache Arrow Table into one sub-table per distinct value of the given column.
+    The partition column is dropped from each sub-table, since Hive-style partitioning
+    stores its value in the folder name (e.g. 'status=Paid/') instead.
+    """
+    partitions = []
+    for value in pc.unique(table[column]).to_pylist():
+        partition = table.filter(pc.equal(table[column], value)).drop_columns([column])
+        partitions.append((value, partition))
+    return partitions
+
+
+def random_dates(num_records):
+    """
+    Generate an array of random dates between start_date and end_date (inclusive).
+    Dates are drawn as day offsets from start_date in a single vectorized call.
+    """
+    num_days = (end_date - start_date).days
+    offsets = rng.integers(0, num_days + 1, num_records).astype('timedelta64[D]')
+    return np.datetime64(start_date.date()) + offsets
+
+
+def random_uuids(num_records):
+    """
+    Generate a list of random UUID strings to use as record identifiers.
+    uuid4 collisions are negligible, so Faker's uniqueness tracking is not needed.
+    """
+    return [str(uuid.uuid4()) for _ in range(num_records)]
+
+
+def random_blood_pressures(num_records):
+    """
+    Generate an array of blood pressure readings formatted as 'systolic/diastolic'.
+    """
+    systolic = rng.integers(110, 141, num_records)
+    diastolic = rng.integers(70, 91, num_records)
+    return np.char.add(np.char.add(systolic.astype(str), '/'), diastolic.astype(str))
+
+
+def build_table(column_specs, num_records):
+    """
+    Build an Apache Arrow Table from a mapping of column name -> (sampler, Arrow type).
+    Each sampler is called once with num_records and returns the whole column,
+    and the Arrow types define the explicit schema of the resulting table.
+    """
+    columns = {name: sampler(num_records) for name, (sampler, _) in column_specs.items()}
+    schema = pa.schema([(name, dtype) for name, (_, dtype) in column_specs.items()])
+    return pa.Table.from_pydict(columns, schema=schema)
 
 
 def generate_patients(num_records):
@@ -108,66 +240,47 @@ def generate_patients(num_records):
     patient_id, name, age, gender, zip code, insurance, registration date.
     """
     print("Generating patient demographic data in CSV format...")
-    patients = []
-    for _ in range(num_records):
-        patient_id = fake.unique.uuid4()  # Unique identifier
-        first_name = fake.first_name()
-        last_name = fake.last_name()
-        age = random.randint(0, 100)
-        gender = random.choice(['Male', 'Female'])
-        zip_code = fake.zipcode()
-        insurance_type = random.choice(['Private', 'Medicare', 'Medicaid'])
-        registration_date = fake.date_between(start_date=start_date, end_date=end_date)
-
-        patients.append({
-            'patient_id': patient_id,
-            'first_name': first_name,
-            'last_name': last_name,
-            'age': age,
-            'gender': gender,
-            'zip_code': zip_code,
-            'insurance_type': insurance_type,
-            'registration_date': str(registration_date)
-        })
-    return pd.DataFrame(patients)
+    # Names and zip codes are sampled from the pre-generated Faker pools
+    column_specs = {
+        'patient_id': (random_uuids, pa.string()),
+        'first_name': (lambda n: rng.choice(FIRST_NAMES, n), pa.string()),
+        'last_name': (lambda n: rng.choice(LAST_NAMES, n), pa.string()),
+        'age': (lambda n: rng.integers(0, 101, n), pa.int64()),
+        'gender': (lambda n: rng.choice(['Male', 'Female'], n), pa.string()),
+        'zip_code': (lambda n: rng.choice(ZIP_CODES, n), pa.string()),
+        'insurance_type': (lambda n: rng.choice(['Private', 'Medicare', 'Medicaid'], n), pa.string()),
+        'registration_date': (lambda n: random_dates(n).astype(str), pa.string())
+    }
+
+    # Convert to a pandas DataFrame for CSV output
+    return build_table(column_specs, num_records).to_pandas()
 
 
 def generate_ehr(num_records, patient_ids):
     """
-    Generate Electronic Health Records (EHR) data in newline-delimited JSON format.
+    Generate Electronic Health Records (EHR) data in Parquet format with an explicit schema.
     Each record contains patient visit info including diagnosis and vital signs.
+    patient_ids is a NumPy array of existing patient IDs to sample from.
     """
-    print("Generating electronic health records data in newline-delimited JSON format...")
-    ehr_records = []
-    for _ in range(num_records):
-        patient_id = random.choice(patient_ids)
-        visit_date = fake.date_between(start_date=start_date, end_date=end_date)
-        diagnosis_code = random.choice(['E11.9', 'I10', 'J45', 'N18.9', 'Z00.0'])
-        diagnosis_desc = {
-            'E11.9': 'Type 2 diabetes mellitus',
-            'I10': 'Essential hypertension',
-            'J45': 'Asthma',
-            'N18.9': 'Chronic kidney disease',
-            'Z00.0': 'General medical exam'
-        }[diagnosis_code]
-        heart_rate = random.randint(60, 100)
-        blood_pressure = f"{random.randint(110, 140)}/{random.randint(70, 90)}"
-        temperature = round(random.uniform(97.0, 99.5), 1)
-
-        ehr_record = {
-            'patient_id': patient_id,
-            'visit_date': str(visit_date),
-            'diagnosis_code': diagnosis_code,
-            'diagnosis_desc': diagnosis_desc,
-            'heart_rate': heart_rate,
-            'blood_pressure': blood_pressure,
-            'temperature': temperature
-        }
-
-        # Append JSON string representation of record for newline-delimited JSON
-        ehr_records.append(json.dumps(ehr_record))
-
-    return ehr_records
+    print("Generating electronic health records data in Parquet format with explicit schema...")
+    column_specs = {
+        'patient_id': (lambda n: rng.choice(patient_ids, n), pa.string()),
+        'visit_date': (random_dates, pa.date32()),
+        'diagnosis_code': (lambda n: rng.choice(DIAGNOSIS_CODES, n), pa.string()),
+        'heart_rate': (lambda n: rng.integers(60, 101, n), pa.int64()),
+        'blood_pressure': (random_blood_pressures, pa.string()),
+        'temperature': (lambda n: rng.uniform(97.0, 99.5, n).round(1), pa.float64())
+    }
+    table = build_table(column_specs, num_records)
+
+    # Derive the diagnosis description from the sampled code and insert it next to it
+    diagnosis_codes = table['diagnosis_code'].combine_chunks()
+    diagnosis_descs = pa.array(list(DIAGNOSIS_DESCRIPTIONS.values())).take(
+        pc.index_in(diagnosis_codes, value_set=pa.array(list(DIAGNOSIS_DESCRIPTIONS)))
+    )
+    return table.add_column(
+        table.schema.get_field_index('diagnosis_code') + 1, 'diagnosis_desc', diagnosis_descs
+    )
 
 
 def generate_claims(num_records, patient_ids):
@@ -175,47 +288,22 @@ def generate_claims(num_records, patient_ids):
     Generate healthcare claims data in Parquet format with an explicit schema.
     Each record includes claim ID, patient, provider, service date, diagnosis,
     procedure code, claim amount, and status.
+    patient_ids is a NumPy array of existing patient IDs to sample from.
     """
     print("Generating claims data in Parquet format with explicit schema...")
-    claims = []
-    for _ in range(num_records):
-        claim_id = fake.unique.uuid4()
-        patient_id = random.choice(patient_ids)
-        provider_id = fake.unique.uuid4()
-        service_date = fake.date_between(start_date=start_date, end_date=end_date)
-        # Ensure service_date is a datetime object with time set to midnight
-        service_date = datetime.combine(service_date, datetime.min.time())
-        diagnosis_code = random.choice(['E11.9', 'I10', 'J45', 'N18.9'])
-        procedure_code = random.choice(['99213', '80053', '83036', '93000'])
-        claim_amount = round(random.uniform(100, 5000), 2)
-        status = random.choice(['Paid', 'Denied', 'Pending'])
-
-        claims.append({
-            'claim_id': str(claim_id),
-            'patient_id': str(patient_id),
-            'provider_id': str(provider_id),
-            'service_date': service_date,
-            'diagnosis_code': diagnosis_code,
-            'procedure_code': procedure_code,
-            'claim_amount': float(claim_amount),
-            'status': status
-        })
-
-    # Define explicit schema to enforce types in the Parquet file
-    schema = pa.schema([
-        ('claim_id', pa.string()),
-        ('patient_id', pa.string()),
-        ('provider_id', pa.string()),
-        ('service_date', pa.timestamp('ms')),
-        ('diagnosis_code', pa.string()),
-        ('procedure_code', pa.string()),
-        ('claim_amount', pa.float64()),
-        ('status', pa.string())
-    ])
-
-    # Convert list of dicts to DataFrame and then to Apache Arrow Table with schema
-    table = pa.Table.from_pandas(pd.DataFrame(claims), schema=schema)
-    return table
+    column_specs = {
+        'claim_id': (random_uuids, pa.string()),
+        'patient_id': (lambda n: rng.choice(patient_ids, n), pa.string()),
+        'provider_id': (random_uuids, pa.string()),
+        # Service dates as timestamps with time set to midnight
+        'service_date': (lambda n: random_dates(n).astype('datetime64[ms]'), pa.timestamp('ms')),
+        'diagnosis_code': (lambda n: rng.choice(['E11.9', 'I10', 'J45', 'N18.9'], n), pa.string()),
+        'procedure_code': (lambda n: rng.choice(['99213', '80053', '83036', '93000'], n), pa.string()),
+        'claim_amount': (lambda n: rng.uniform(100, 5000, n).round(2), pa.float64()),
+        'status': (lambda n: rng.choice(['Paid', 'Denied', 'Pending'], n), pa.string())
+    }
+
+    return build_table(column_specs, num_records)
 
 
 # -------------------- Main script execution --------------------
@@ -223,28 +311,43 @@ def generate_claims(num_records, patient_ids):
 # Ensure the GCS bucket exists before uploading data
 create_bucket()
 
-# Clear out development folder in GCS before uploading fresh dev data
-empty_gcs_folder(DEV_PATH)
-# Generate fake patient, EHR, and claims data for development environment
-dev_patients = generate_patients(DEV_RECORDS)
-dev_ehr = generate_ehr(DEV_RECORDS, dev_patients['patient_id'].tolist())
-dev_claims = generate_claims(DEV_RECORDS, dev_patients['patient_id'].tolist())
+# Clear out development and production folders in GCS before uploading fresh data
+with ThreadPoolExecutor(max_workers=2) as executor:
+    list(executor.map(empty_gcs_folder, [DEV_PATH, PROD_PATH]))
 
-# Upload generated development data to respective folders in GCS
-upload_to_gcs(dev_patients, DEV_PATH, 'patient_data.csv', 'csv')
-upload_to_gcs(dev_ehr, DEV_PATH, 'ehr_data.json', 'json')
-upload_to_gcs(dev_claims, DEV_PATH, 'claims_data.parquet', 'parquet')
-
-# Clear out production folder in GCS before uploading fresh prod data
-empty_gcs_folder(PROD_PATH)
 # Generate fake patient, EHR, and claims data for production environment
 prod_patients = generate_patients(PROD_RECORDS)
-prod_ehr = generate_ehr(PROD_RECORDS, prod_patients['patient_id'].tolist())
-prod_claims = generate_claims(PROD_RECORDS, prod_patients['patient_id'].tolist())
-
-# Upload generated production data to respective folders in GCS
-upload_to_gcs(prod_patients, PROD_PATH, 'patient_data.csv', 'csv')
-upload_to_gcs(prod_ehr, PROD_PATH, 'ehr_data.json', 'json')
-upload_to_gcs(prod_claims, PROD_PATH, 'claims_data.parquet', 'parquet')
+prod_patient_ids = prod_patients['patient_id'].to_numpy()
+prod_ehr = generate_ehr(PROD_RECORDS, prod_patient_ids)
+prod_claims = generate_claims(PROD_RECORDS, prod_patient_ids)
+
+# Reuse a subset of the production patients for the development environment
+# instead of generating a second, independent set with the same distribution.
+# Dev EHR and claims are generated against the dev patients only, so every
+# record still references a patient present in the dev patient file.
+dev_patients = prod_patients.iloc[:DEV_RECORDS].copy()
+dev_patient_ids = prod_patient_ids[:DEV_RECORDS]
+dev_ehr = generate_ehr(DEV_RECORDS, dev_patient_ids)
+dev_claims = generate_claims(DEV_RECORDS, dev_patient_ids)
+
+# Upload generated development and production data to respective folders in GCS.
+# Uploads are independent and I/O-bound, so they run concurrently.
+uploads = [
+    (dev_patients, DEV_PATH, 'patient_data.csv', 'csv'),
+    (dev_ehr, DEV_PATH, 'ehr_data.parquet', 'parquet'),
+    (prod_patients, PROD_PATH, 'patient_data.csv', 'csv'),
+    (prod_ehr, PROD_PATH, 'ehr_data.parquet', 'parquet')
+]
+# Claims are written as a Hive-style Parquet dataset partitioned by status,
+# so downstream queries filtering on status can skip non-matching files
+for claims, path in [(dev_claims, DEV_PATH), (prod_claims, PROD_PATH)]:
+    for status, partition in partition_table(claims, 'status'):
+        uploads.append((partition, f"{path}claims_data/status={status}/", 'part-0.parquet', 'parquet'))
+with ThreadPoolExecutor(max_workers=len(uploads)) as executor:
+    futures = [executor.submit(upload_to_gcs, *upload) for upload in uploads]
+    for future in futures:
+        future.result()  # Re-raise any error from a failed upload
+# Report a single summary line rather than one line per upload
+print(f"Uploaded {len(uploads)} files to folders '{DEV_PATH}' and '{PROD_PATH}' in GCS bucket '{BUCKET_NAME}'.")
 
 print("Data generation and upload to GCS completed successfully.")